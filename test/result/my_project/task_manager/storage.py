@@ -1,75 +1,221 @@
 """
 Module for saving and loading tasks
+
+Tasks are stored as an append-only JSON Lines log: every change appends
+one record, and the log is rewritten once it grows well past the number
+of live tasks.
 """
+import itertools
 import json
 import os
-from typing import List, Optional
-from task_manager.models import Task
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from task_manager.models import Task, Priority
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    """Serialize to compact UTF-8 JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+_loads = orjson.loads if orjson is not None else json.loads
 
 
 class TaskStorage:
     """Class for working with task storage"""
     
-    def __init__(self, filename: str = "tasks.json"):
+    def __init__(self, filename: str = "tasks.jsonl"):
         self.filename = filename
-        self.tasks: List[Task] = []
+        # Tasks by ID; dicts keep insertion order, so this is also the task list
+        self._by_id: Dict[int, Task] = {}
+        # Task IDs split by status, so counts need no scan; the filtered
+        # task lists still come from _by_id to keep insertion order
+        self._completed_ids: Set[int] = set()
+        self._incomplete_ids: Set[int] = set()
         self.next_id = 1
+        self.log_records = 0
         self.load_tasks()
     
+    @property
+    def tasks(self) -> List[Task]:
+        """All tasks in the order they were added"""
+        return list(self._by_id.values())
+    
     def load_tasks(self):
-        """Load tasks from file"""
-        if os.path.exists(self.filename):
-            try:
-                with open(self.filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.tasks = [Task.from_dict(task_data) for task_data in data]
-                    if self.tasks:
-                        self.next_id = max(task.id for task in self.tasks) + 1
-            except (json.JSONDecodeError, KeyError):
-                self.tasks = []
-                self.next_id = 1
+        """Load tasks by replaying the log"""
+        filename = self.filename
+        if not os.path.exists(filename):
+            # Tasks saved before the log format are in a JSON array file
+            filename = os.path.splitext(filename)[0] + '.json'
+            if filename == self.filename or not os.path.exists(filename):
+                return
+        rows: Dict[int, dict] = {}
+        records = 0
+        # Set when the log has to be rewritten: it ends in a partial record,
+        # e.g. after a crash mid-append, or it is still a JSON array
+        rewrite = False
+        with open(filename, 'rb') as f:
+            first = f.readline()
+            if first.lstrip().startswith(b'['):
+                rows = {d['id']: d for d in _loads(first + f.read())}
+                rewrite = True
+            else:
+                # Line number of a record that could not be read
+                bad_line = 0
+                for lineno, line in enumerate(itertools.chain((first,), f), 1):
+                    if not line.strip():
+                        continue
+                    if bad_line:
+                        # Only the last record can be cut off by a crash
+                        raise ValueError(
+                            f"Unreadable record on line {bad_line} of {filename}"
+                        )
+                    try:
+                        record = _loads(line)
+                        if record['op'] == 'del':
+                            rows.pop(record['id'], None)
+                        else:
+                            rows[record['task']['id']] = record['task']
+                    except (ValueError, KeyError, TypeError):
+                        bad_line = lineno
+                        continue
+                    records += 1
+                    if not line.endswith(b'\n'):
+                        # Complete record, but the next append must start a new line
+                        rewrite = True
+                if bad_line:
+                    rewrite = True
+        data = rows.values()
+        # Same as Task.from_dict, with lookups bound once for all rows
+        from_iso = datetime.fromisoformat
+        priorities = Priority.__members__
+        self._by_id = {
+            d['id']: Task(
+                id=d['id'],
+                title=d['title'],
+                description=d['description'],
+                priority=priorities[d['priority']],
+                completed=d['completed'],
+                created_at=from_iso(d['created_at']) if d['created_at'] else None,
+                completed_at=from_iso(d['completed_at']) if d['completed_at'] else None
+            )
+            for d in data
+        }
+        self._completed_ids = {task.id for task in self._by_id.values() if task.completed}
+        self._incomplete_ids = self._by_id.keys() - self._completed_ids
+        self.next_id = max(self._by_id, default=0) + 1
+        self.log_records = records
+        if rewrite or filename != self.filename:
+            # Everything was read, so the rewritten log loses nothing
+            self.save_tasks()
     
     def save_tasks(self):
-        """Save tasks to file"""
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump([task.to_dict() for task in self.tasks], f, ensure_ascii=False, indent=2)
+        """Rewrite the log with one record per task"""
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'wb') as f:
+            f.write(b''.join(
+                _dumps({'op': 'add', 'task': task.to_dict()}) + b'\n'
+                for task in self._by_id.values()
+            ))
+        os.replace(tmp_filename, self.filename)
+        self.log_records = len(self._by_id)
+    
+    def compact(self):
+        """Rewrite the log once it holds over twice as many records as tasks"""
+        if self.log_records > 2 * len(self._by_id):
+            self.save_tasks()
+    
+    def _append(self, record: dict):
+        """Append one change record to the log"""
+        with open(self.filename, 'ab') as f:
+            f.write(_dumps(record) + b'\n')
+        self.log_records += 1
+        self.compact()
     
     def add_task(self, task: Task) -> Task:
         """Add new task"""
         task.id = self.next_id
         self.next_id += 1
-        self.tasks.append(task)
-        self.save_tasks()
+        self._by_id[task.id] = task
+        self._track_status(task)
+        self._append({'op': 'add', 'task': task.to_dict()})
         return task
     
     def get_task(self, task_id: int) -> Optional[Task]:
         """Get task by ID"""
-        for task in self.tasks:
-            if task.id == task_id:
-                return task
-        return None
+        return self._by_id.get(task_id)
     
     def update_task(self, task: Task):
         """Update task"""
-        self.save_tasks()
+        if task.id not in self._by_id:
+            # Deleted tasks must not come back through the log or the counts
+            return
+        self._track_status(task)
+        self._append({'op': 'upd', 'task': task.to_dict()})
+    
+    def mark_completed(self, task_id: int) -> bool:
+        """Mark task as completed and save it"""
+        task = self._by_id.get(task_id)
+        if task is None:
+            return False
+        task.mark_completed()
+        self.update_task(task)
+        return True
+    
+    def mark_incomplete(self, task_id: int) -> bool:
+        """Mark task as incomplete and save it"""
+        task = self._by_id.get(task_id)
+        if task is None:
+            return False
+        task.mark_incomplete()
+        self.update_task(task)
+        return True
+    
+    def _track_status(self, task: Task):
+        """Move the task ID into the set matching its status"""
+        if task.completed:
+            self._incomplete_ids.discard(task.id)
+            self._completed_ids.add(task.id)
+        else:
+            self._completed_ids.discard(task.id)
+            self._incomplete_ids.add(task.id)
     
     def delete_task(self, task_id: int) -> bool:
         """Delete task by ID"""
-        for i, task in enumerate(self.tasks):
-            if task.id == task_id:
-                del self.tasks[i]
-                self.save_tasks()
-                return True
-        return False
+        if self._by_id.pop(task_id, None) is None:
+            return False
+        self._completed_ids.discard(task_id)
+        self._incomplete_ids.discard(task_id)
+        self._append({'op': 'del', 'id': task_id})
+        return True
     
     def get_all_tasks(self) -> List[Task]:
         """Get all tasks"""
-        return self.tasks
+        return list(self._by_id.values())
     
     def get_incomplete_tasks(self) -> List[Task]:
         """Get incomplete tasks"""
-        return [task for task in self.tasks if not task.completed]
+        return [task for task in self._by_id.values() if not task.completed]
     
     def get_completed_tasks(self) -> List[Task]:
         """Get completed tasks"""
-        return [task for task in self.tasks if task.completed]
+        return [task for task in self._by_id.values() if task.completed]
+    
+    def get_task_count(self) -> int:
+        """Get number of tasks"""
+        return len(self._by_id)
+    
+    def get_completed_count(self) -> int:
+        """Get number of completed tasks"""
+        return len(self._completed_ids)
+    
+    def get_incomplete_count(self) -> int:
+        """Get number of incomplete tasks"""
+        return len(self._incomplete_ids)
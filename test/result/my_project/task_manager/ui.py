@@ -102,8 +102,7 @@ class TaskManagerUI:
                 if task.completed:
                     print("Task already completed!")
                 else:
-                    task.mark_completed()
-                    self.storage.update_task(task)
+                    self.storage.mark_completed(task.id)
                     print(f"✓ Task '{task.title}' marked as completed!")
             else:
                 print("Task not found!")
@@ -130,15 +129,15 @@ class TaskManagerUI:
     
     def show_statistics(self):
         """Show statistics"""
-        all_tasks = self.storage.get_all_tasks()
-        completed = self.storage.get_completed_tasks()
-        incomplete = self.storage.get_incomplete_tasks()
+        total = self.storage.get_task_count()
+        completed = self.storage.get_completed_count()
+        incomplete = self.storage.get_incomplete_count()
         
         print("\n--- Statistics ---")
-        print(f"Total tasks: {len(all_tasks)}")
-        print(f"Completed: {len(completed)}")
-        print(f"Incomplete: {len(incomplete)}")
+        print(f"Total tasks: {total}")
+        print(f"Completed: {completed}")
+        print(f"Incomplete: {incomplete}")
         
-        if all_tasks:
-            completion_rate = (len(completed) / len(all_tasks)) * 100
+        if total:
+            completion_rate = (completed / total) * 100
             print(f"Completion rate: {completion_rate:.1f}%")
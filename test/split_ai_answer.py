@@ -7,13 +7,46 @@ Splits a structured AI response into multiple files and directories.
 import os
 import sys
 import argparse
+import contextlib
 import logging
-from typing import List, Tuple, Dict
+import mmap
+from concurrent.futures import (
+    ALL_COMPLETED, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+)
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Union
 
 
-def parse_files(text: str) -> List[Tuple[str, str]]:
+logger = logging.getLogger(__name__)
+
+# Parser states for parse_files
+_SEEK_FILE, _SEEK_SEP, _IN_CONTENT, _SEEK_END = range(4)
+
+# Block markers
+_FILE_TAG = "FILE "
+_FILE_TAG_LEN = len(_FILE_TAG)
+_FILE_TAG_UTF8 = _FILE_TAG.encode('utf-8')
+_END_TAG = "END FILE"
+
+# Flags for output files; O_BINARY keeps Windows from translating bytes
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+# Line breaks other than '\n' that str.splitlines() also splits on
+_OTHER_BREAKS = '\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+_OTHER_BREAKS_UTF8 = tuple(ch.encode('utf-8') for ch in _OTHER_BREAKS)
+
+# Characters read at a time when splitting a text stream into lines
+_READ_CHUNK = 1 << 20
+
+
+def parse_files(
+    lines: Union[Iterable[str], bytes, mmap.mmap]
+) -> Iterator[Tuple[str, str]]:
     """
-    Parses AI response text into a list of (path, content) tuples.
+    Parses AI response lines into (path, content) tuples.
+    Accepts an open text stream (a file, sys.stdin), any other iterable
+    of lines, a whole string, or UTF-8 bytes / an mmap, and yields each
+    block as soon as its END FILE line is read. Streams, strings and
+    bytes are all split into lines the way str.splitlines() does.
     Expected format:
 
     FILE path/to/file.py
@@ -22,55 +55,194 @@ def parse_files(text: str) -> List[Tuple[str, str]]:
     ================================
     END FILE
     """
-    lines = text.splitlines(keepends=True)
+    if isinstance(lines, (bytes, mmap.mmap)):
+        if not any(lines.find(br) >= 0 for br in _OTHER_BREAKS_UTF8):
+            yield from _scan_text(lines)
+            return
+        lines = _decode(lines[:])
+    if isinstance(lines, str):
+        if not any(ch in lines for ch in _OTHER_BREAKS):
+            yield from _scan_text(lines)
+            return
+        lines = lines.splitlines(keepends=True)
+    elif hasattr(lines, 'read'):
+        # Iterating a text stream splits on '\n' only
+        lines = _read_lines(lines)
+
+    state = _SEEK_FILE
+    path = ""
+    sep_line = ""
+    start_line = 0
+    lineno = 0
+    content_lines: List[str] = []
+
+    # Globals used once per line, bound to fast locals
+    seek_file, seek_sep, in_content = _SEEK_FILE, _SEEK_SEP, _IN_CONTENT
+    file_tag, tag_len, is_sep = _FILE_TAG, _FILE_TAG_LEN, is_separator
+
+    # Lines are only stripped when they can be a marker; content lines,
+    # the bulk of the input, are checked with a substring test first.
+    for lineno, raw_line in enumerate(lines, 1):
+        if state == in_content:
+            # Collect content until next identical separator
+            if sep_line in raw_line and raw_line.strip() == sep_line:
+                state = _SEEK_END
+            else:
+                content_lines.append(raw_line)
 
-    idx = 0
-    n = len(lines)
-    result = []
+        elif state == seek_file:
+            # Look for block start
+            if file_tag in raw_line:
+                line = raw_line.strip()
+                if line.startswith(file_tag):
+                    path = line[tag_len:].strip()
+                    start_line = lineno
+                    state = seek_sep
 
-    while idx < n:
-        line = lines[idx].strip()
+        elif state == seek_sep:
+            # Look for first separator line
+            line = raw_line.strip()
+            if is_sep(line):
+                sep_line = line
+                state = in_content
 
+        else:
+            # Expect END FILE
+            if raw_line.strip() != _END_TAG:
+                raise ValueError(
+                    f"Expected 'END FILE' after file {path} (line {lineno})"
+                )
+            content = "".join(content_lines)
+            content_lines = []
+            state = seek_file
+            yield path, content
+
+    if state == _SEEK_SEP:
+        raise ValueError(
+            f"Separator not found after FILE {path} (line {start_line})"
+        )
+    if state == _IN_CONTENT:
+        raise ValueError(
+            f"Closing separator not found for file {path} (line {start_line})"
+        )
+    if state == _SEEK_END:
+        raise ValueError(
+            f"Expected 'END FILE' after file {path} (line {lineno + 1})"
+        )
+
+
+def _read_lines(stream) -> Iterator[str]:
+    """Yield the lines of a text stream as str.splitlines(keepends=True) would."""
+    pending = ""
+    for chunk in iter(lambda: stream.read(_READ_CHUNK), ""):
+        lines = (pending + chunk).splitlines(keepends=True)
+        # The last line may continue in the next chunk
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _scan_text(text: Union[str, bytes, mmap.mmap]) -> Iterator[Tuple[str, str]]:
+    """
+    Equivalent of parse_files for a whole string whose only line break
+    is '\n'. Block markers are located with find(), so only candidate
+    lines are examined in Python and content is sliced out in one piece.
+    
+    text may also be UTF-8 bytes or an mmap; then only marker lines and
+    block contents are decoded.
+    """
+    if isinstance(text, str):
+        file_tag, eq_sep, dash_sep, newline = _FILE_TAG, "=" * 10, "-" * 10, "\n"
+    else:
+        file_tag, eq_sep, dash_sep, newline = _FILE_TAG_UTF8, b"=" * 10, b"-" * 10, b"\n"
+    n = len(text)
+    pos = 0
+    eq_idx = dash_idx = 0
+    while True:
         # Look for block start
-        if not line.startswith("FILE "):
-            idx += 1
+        idx = text.find(file_tag, pos)
+        if idx < 0:
+            return
+        start, end = _line_bounds(text, idx, newline)
+        line = _decode(text[start:end]).strip()
+        pos = end
+        if not line.startswith(_FILE_TAG):
             continue
-
-        path = line[len("FILE "):].strip()
-        start_line = idx + 1
-        idx += 1
+        path = line[_FILE_TAG_LEN:].strip()
+        file_start = start
 
         # Look for first separator line
-        while idx < n and not is_separator(lines[idx].strip()):
-            idx += 1
-        if idx >= n:
-            raise ValueError(
-                f"Separator not found after FILE {path} (line {start_line})"
-            )
-        sep_line = lines[idx].strip()
-        idx += 1
-
-        # Collect content until next identical separator
-        content_lines = []
-        while idx < n and lines[idx].strip() != sep_line:
-            content_lines.append(lines[idx])
-            idx += 1
-        if idx >= n:
-            raise ValueError(
-                f"Closing separator not found for file {path} (line {start_line})"
-            )
-        idx += 1  # skip closing separator
+        while True:
+            # Remember the next candidates, as find() returns -1 only
+            # after scanning to the end of the text
+            if 0 <= eq_idx < pos:
+                eq_idx = text.find(eq_sep, pos)
+            if 0 <= dash_idx < pos:
+                dash_idx = text.find(dash_sep, pos)
+            if eq_idx < 0 or 0 <= dash_idx < eq_idx:
+                idx = dash_idx
+            else:
+                idx = eq_idx
+            if idx < 0:
+                raise ValueError(
+                    f"Separator not found after FILE {path} "
+                    f"(line {_line_number(text, file_start, newline)})"
+                )
+            start, pos = _line_bounds(text, idx, newline)
+            sep_line = _decode(text[start:pos]).strip()
+            if is_separator(sep_line):
+                break
+        sep_mark = sep_line if isinstance(text, str) else sep_line.encode()
+        content_start = pos + 1
+
+        # Find the next identical separator
+        pos = content_start
+        while True:
+            idx = text.find(sep_mark, pos) if pos < n else -1
+            if idx < 0:
+                raise ValueError(
+                    f"Closing separator not found for file {path} "
+                    f"(line {_line_number(text, file_start, newline)})"
+                )
+            start, pos = _line_bounds(text, idx, newline)
+            if _decode(text[start:pos]).strip() == sep_line:
+                break
+        content_end = start
 
         # Expect END FILE
-        if idx >= n or lines[idx].strip() != "END FILE":
+        end_line = None
+        if pos < n:
+            start, pos = _line_bounds(text, pos + 1, newline)
+            end_line = _decode(text[start:pos]).strip()
+        if end_line != _END_TAG:
             raise ValueError(
-                f"Expected 'END FILE' after file {path} (line {idx + 1})"
+                f"Expected 'END FILE' after file {path} "
+                f"(line {_line_number(text, content_end, newline) + 1})"
             )
-        idx += 1  # skip END FILE
 
-        result.append((path, "".join(content_lines)))
+        yield path, _decode(text[content_start:content_end])
+
+
+def _decode(chunk: Union[str, bytes]) -> str:
+    """Return a slice of the input as str, decoding it if it is UTF-8 bytes."""
+    if isinstance(chunk, str):
+        return chunk
+    return chunk.decode('utf-8')
 
-    return result
+
+def _line_bounds(text, idx: int, newline="\n") -> Tuple[int, int]:
+    """Return the start and end offsets of the line containing idx."""
+    start = text.rfind(newline, 0, idx) + 1
+    end = text.find(newline, idx)
+    if end < 0:
+        end = len(text)
+    return start, end
+
+
+def _line_number(text, offset: int, newline="\n") -> int:
+    """Return the 1-based line number of an offset."""
+    return text[:offset].count(newline) + 1
 
 
 def is_separator(line: str) -> bool:
@@ -78,18 +250,23 @@ def is_separator(line: str) -> bool:
     Considers a line to be a separator if it consists of >=10
     identical '=' or '-' characters.
     """
-    if len(line) < 10:
+    n = len(line)
+    if n < 10:
         return False
-    chars = set(line)
-    if len(chars) != 1:
+    c = line[0]
+    if c != "=" and c != "-":
         return False
-    return line[0] in ("=", "-")
+    return line.count(c) == n
 
 
-def validate_path(rel_path: str, output_dir: str) -> None:
+def validate_path(rel_path: str, base_path: str, base_prefix: str) -> None:
     """
     Ensure the path doesn't escape output directory and is safe.
     
+    base_path is the resolved output directory and base_prefix is
+    base_path ending with exactly one separator; both are computed once
+    by the caller rather than per block.
+    
     Raises:
         ValueError: If path is invalid or potentially dangerous.
     """
@@ -97,82 +274,239 @@ def validate_path(rel_path: str, output_dir: str) -> None:
     if '..' in rel_path:
         raise ValueError(f"Path contains '..': {rel_path}")
     
-    if rel_path.startswith('/') or rel_path.startswith('\\'):
+    if rel_path.startswith(('/', '\\')):
         raise ValueError(f"Path is absolute: {rel_path}")
     
     # Verify the resolved path stays within output_dir
-    full_path = os.path.abspath(os.path.join(output_dir, rel_path))
-    base_path = os.path.abspath(output_dir)
+    full_path = os.path.normpath(os.path.join(base_path, rel_path))
     
-    if not full_path.startswith(base_path + os.sep) and full_path != base_path:
+    if not full_path.startswith(base_prefix) and full_path != base_path:
         raise ValueError(f"Path escapes output directory: {rel_path}")
 
 
+def _file_exists(file_path: str, dir_names: Dict[str, Set[str]]) -> bool:
+    """
+    Check whether file_path exists, listing each directory only once.
+    
+    dir_names caches case-folded directory listings keyed by directory.
+    A listing hit is confirmed with os.path.exists, so case-insensitive
+    file systems are handled without false positives.
+    """
+    dir_name = os.path.dirname(file_path)
+    names = dir_names.get(dir_name)
+    if names is None:
+        try:
+            names = {name.casefold() for name in os.listdir(dir_name or '.')}
+        except (FileNotFoundError, NotADirectoryError):
+            names = set()
+        dir_names[dir_name] = names
+    
+    if os.path.basename(file_path).casefold() not in names:
+        return False
+    return os.path.exists(file_path)
+
+
+def _write_raw(file_path: str, data: bytes) -> None:
+    """
+    Write bytes to a file with os.open/os.write, bypassing the buffered
+    text layer that open() sets up for every file.
+    """
+    fd = os.open(file_path, _WRITE_FLAGS, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            # os.write may write less than requested
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _collect_write(
+    stats: Dict[str, int],
+    file_path: str,
+    future: Future,
+    rel_path: str,
+    size: int
+) -> None:
+    """Wait for a write submitted to the thread pool and record its outcome."""
+    try:
+        future.result()
+    except OSError as e:
+        logger.error("Failed to create %s: %s", rel_path, e)
+        stats['errors'] += 1
+    except Exception as e:
+        logger.error("Unexpected error with %s: %s", rel_path, e)
+        stats['errors'] += 1
+    else:
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Created: %s", file_path)
+        stats['created'] += 1
+        stats['bytes'] += size
+
+
+def _drain_writes(
+    stats: Dict[str, int],
+    pending: Dict[str, Tuple[Future, str, int]],
+    return_when: str = ALL_COMPLETED
+) -> None:
+    """Wait for pooled writes as wait() does and record the finished ones."""
+    paths = {entry[0]: file_path for file_path, entry in pending.items()}
+    done, _ = wait(paths, return_when=return_when)
+    for future in done:
+        _collect_write(stats, paths[future], *pending.pop(paths[future]))
+
+
 def write_files(
-    blocks: List[Tuple[str, str]],
+    blocks: Iterable[Tuple[str, str]],
     output_dir: str,
     encoding: str = 'utf-8',
     dry_run: bool = False,
-    force: bool = False
+    force: bool = False,
+    jobs: int = 1
 ) -> Dict[str, int]:
     """
     Creates files from parsed blocks.
+    Blocks are consumed lazily, so a parse_files generator can be
+    passed in directly.
+    
+    With jobs > 1 the file writes run in a thread pool of that size.
+    Validation, directory creation and overwrite prompts still happen
+    one block at a time in the calling thread, and at most 2 * jobs
+    blocks are held waiting for the pool.
     
     Returns:
-        Dictionary with statistics: created, skipped, errors.
+        Dictionary with statistics: created, skipped, errors, and
+        bytes (total size of the created files).
     """
-    stats = {'created': 0, 'skipped': 0, 'errors': 0}
+    stats = {'created': 0, 'skipped': 0, 'errors': 0, 'bytes': 0}
+    # Checked once so per-file messages are not built when not shown
+    info_enabled = logger.isEnabledFor(logging.INFO)
+    base_path = os.path.realpath(output_dir)
+    # join() adds a separator unless base_path already ends with one ('/', 'C:\\')
+    base_prefix = os.path.join(base_path, '')
+    # Directories already ensured, so makedirs runs once per directory
+    created_dirs = set()
+    # Listings of output directories, used instead of a stat per file
+    dir_names: Dict[str, Set[str]] = {}
 
-    for rel_path, content in blocks:
-        try:
-            # Validate path
-            validate_path(rel_path, output_dir)
-            
-            file_path = os.path.join(output_dir, rel_path)
-            dir_name = os.path.dirname(file_path)
-
-            # Check if file exists
-            if os.path.exists(file_path) and not force and not dry_run:
-                logging.warning(f"File exists: {file_path}")
-                try:
-                    response = input(f"Overwrite {rel_path}? [y/N]: ")
-                    if response.lower() != 'y':
-                        logging.info(f"Skipped: {file_path}")
+    executor = None
+    if jobs > 1 and not dry_run:
+        executor = ThreadPoolExecutor(max_workers=jobs)
+    # Writes still running in the pool, keyed by file path
+    pending: Dict[str, Tuple[Future, str, int]] = {}
+
+    try:
+        for rel_path, content in blocks:
+            try:
+                # Validate path
+                validate_path(rel_path, base_path, base_prefix)
+                
+                file_path = os.path.join(output_dir, rel_path)
+                dir_name = os.path.dirname(file_path)
+
+                if executor is not None:
+                    # An earlier block for the same name may still be queued;
+                    # finish it so the existence check sees the file and a
+                    # repeated path never races with its earlier write
+                    folded = file_path.casefold()
+                    for queued in [p for p in pending if p.casefold() == folded]:
+                        _collect_write(stats, queued, *pending.pop(queued))
+
+                # Check if file exists
+                if not force and not dry_run and _file_exists(file_path, dir_names):
+                    logger.warning("File exists: %s", file_path)
+                    try:
+                        response = input(f"Overwrite {rel_path}? [y/N]: ")
+                        if response.lower() != 'y':
+                            logger.info("Skipped: %s", file_path)
+                            stats['skipped'] += 1
+                            continue
+                    except (EOFError, KeyboardInterrupt):
+                        logger.info("\nSkipping file due to user input interruption")
                         stats['skipped'] += 1
                         continue
-                except (EOFError, KeyboardInterrupt):
-                    logging.info("\nSkipping file due to user input interruption")
-                    stats['skipped'] += 1
+
+                # Encode once: the same bytes are measured and written
+                if os.linesep != '\n':
+                    content = content.replace('\n', os.linesep)
+                encoded = content.encode(encoding)
+
+                if dry_run:
+                    if info_enabled:
+                        logger.info("Would create: %s (%d bytes)", file_path, len(encoded))
+                    stats['created'] += 1
+                    stats['bytes'] += len(encoded)
                     continue
 
-            if dry_run:
-                logging.info(f"Would create: {file_path} ({len(content)} bytes)")
-                stats['created'] += 1
-            else:
                 # Create directory if needed
-                if dir_name:
+                if dir_name and dir_name not in created_dirs:
                     os.makedirs(dir_name, exist_ok=True)
+                    # makedirs also created every missing parent
+                    parent = dir_name
+                    while parent and parent not in created_dirs:
+                        created_dirs.add(parent)
+                        parent = os.path.dirname(parent)
                 
+                names = dir_names.get(dir_name)
+                if names is not None:
+                    names.add(os.path.basename(file_path).casefold())
+
                 # Write file
-                with open(file_path, "w", encoding=encoding) as f:
-                    f.write(content)
+                if executor is not None:
+                    future = executor.submit(_write_raw, file_path, encoded)
+                    pending[file_path] = (future, rel_path, len(encoded))
+                    # Stop pulling blocks from the parser while the pool is behind
+                    if len(pending) >= 2 * jobs:
+                        _drain_writes(stats, pending, FIRST_COMPLETED)
+                    continue
+
+                _write_raw(file_path, encoded)
                 
-                logging.info(f"Created: {file_path}")
+                if info_enabled:
+                    logger.info("Created: %s", file_path)
                 stats['created'] += 1
+                stats['bytes'] += len(encoded)
 
-        except ValueError as e:
-            logging.error(f"Invalid path {rel_path}: {e}")
-            stats['errors'] += 1
-        except OSError as e:
-            logging.error(f"Failed to create {rel_path}: {e}")
-            stats['errors'] += 1
-        except Exception as e:
-            logging.error(f"Unexpected error with {rel_path}: {e}")
-            stats['errors'] += 1
+            except UnicodeEncodeError as e:
+                logger.error("Cannot encode %s as %s: %s", rel_path, encoding, e)
+                stats['errors'] += 1
+            except ValueError as e:
+                logger.error("Invalid path %s: %s", rel_path, e)
+                stats['errors'] += 1
+            except OSError as e:
+                logger.error("Failed to create %s: %s", rel_path, e)
+                stats['errors'] += 1
+            except Exception as e:
+                logger.error("Unexpected error with %s: %s", rel_path, e)
+                stats['errors'] += 1
+    finally:
+        if executor is not None:
+            # Also runs on a parse error, so writes already made are reported
+            _drain_writes(stats, pending)
+            executor.shutdown()
 
     return stats
 
 
+def _open_input(path: str):
+    """
+    Open the input file for parse_files: as a read-only mmap when the
+    file can be mapped, otherwise as a buffered text stream.
+    """
+    f = open(path, 'r', encoding='utf-8', buffering=1 << 20)
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        # Empty files, pipes and devices cannot be mapped
+        return f
+    # Text mode translates '\r\n' and '\r'; keep that by streaming instead
+    if mm.find(b'\r') >= 0:
+        mm.close()
+        return f
+    f.close()
+    return mm
+
+
 def setup_logging(verbose: bool = False, quiet: bool = False) -> None:
     """Configure logging based on verbosity flags."""
     if quiet:
@@ -226,6 +560,14 @@ def main():
         help='Overwrite existing files without prompting'
     )
     
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Write up to N files in parallel (default: 1)'
+    )
+    
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
@@ -245,6 +587,8 @@ def main():
     )
     
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
     
     # Setup logging
     setup_logging(args.verbose, args.quiet)
@@ -252,62 +596,54 @@ def main():
     try:
         # Read input
         if args.input == '-':
-            logging.debug("Reading from stdin...")
-            text = sys.stdin.read()
+            logger.debug("Reading from stdin...")
+            if args.force or args.dry_run:
+                source = contextlib.nullcontext(sys.stdin)
+            else:
+                # Overwrite prompts also read stdin, so consume the whole
+                # response before any prompt can be shown
+                source = contextlib.nullcontext(sys.stdin.read())
         else:
-            logging.debug(f"Reading from file: {args.input}")
-            with open(args.input, 'r', encoding='utf-8') as f:
-                text = f.read()
-        
-        if not text.strip():
-            logging.error("Input is empty")
-            return 1
+            logger.debug("Reading from file: %s", args.input)
+            source = _open_input(args.input)
         
-        # Parse blocks
-        logging.debug("Parsing file blocks...")
-        blocks = parse_files(text)
+        # Parse blocks and write files as they are found
+        logger.debug("Parsing file blocks...")
+        with source as f:
+            stats = write_files(
+                parse_files(f),
+                args.output_dir,
+                encoding=args.encoding,
+                dry_run=args.dry_run,
+                force=args.force,
+                jobs=args.jobs
+            )
         
-        if not blocks:
-            logging.warning("No file blocks found in input")
+        if not stats['created'] + stats['skipped'] + stats['errors']:
+            logger.warning("No file blocks found in input")
             return 0
         
-        logging.info(f"Found {len(blocks)} file(s) to process")
-        
-        # Create output directory if needed
-        if args.output_dir != '.' and not args.dry_run:
-            os.makedirs(args.output_dir, exist_ok=True)
-            logging.debug(f"Ensured output directory exists: {args.output_dir}")
-        
-        # Write files
-        stats = write_files(
-            blocks,
-            args.output_dir,
-            encoding=args.encoding,
-            dry_run=args.dry_run,
-            force=args.force
-        )
-        
         # Print summary
         mode = "Would create" if args.dry_run else "Created"
-        logging.info(
-            f"\nSummary: {mode} {stats['created']} file(s), "
-            f"skipped {stats['skipped']}, "
-            f"errors {stats['errors']}"
+        logger.info(
+            "\nSummary: %s %d file(s) (%d bytes), skipped %d, errors %d",
+            mode, stats['created'], stats['bytes'],
+            stats['skipped'], stats['errors']
         )
         
         return 1 if stats['errors'] > 0 else 0
         
     except FileNotFoundError as e:
-        logging.error(f"File not found: {e}")
+        logger.error("File not found: %s", e)
         return 1
     except ValueError as e:
-        logging.error(f"Parse error: {e}")
+        logger.error("Parse error: %s", e)
         return 1
     except KeyboardInterrupt:
-        logging.info("\nOperation cancelled by user")
+        logger.info("\nOperation cancelled by user")
         return 130
     except Exception as e:
-        logging.error(f"Unexpected error: {e}")
+        logger.error("Unexpected error: %s", e)
         if args.verbose:
             import traceback
             traceback.print_exc()